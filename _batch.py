@@ -0,0 +1,40 @@
+# _batch.py
+"""
+Batch mode shared by the CLI entry points: fan a list of fonts out over a process
+pool and emit one JSON line per job (NDJSON), in input order.
+"""
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from _output import dumps
+
+def read_batch_file(path: str) -> list[str]:
+    """Non-blank lines of a batch file, stripped ('-' reads stdin)."""
+    if path == '-':
+        return [line.strip() for line in sys.stdin if line.strip()]
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def _guarded(fn, args):
+    # a failure in one font becomes that line's error instead of aborting the batch
+    try:
+        return fn(*args)
+    except Exception as e:
+        return {"error": str(e)}
+
+def run_batch(fn, *iterables, chunksize: int = 8) -> int:
+    """
+    Call fn(*args) for each zip(*iterables) across all cores and write the results
+    to stdout as NDJSON. Returns the process exit code: 0 if no result has an
+    'error' key, 1 otherwise.
+    """
+    jobs = list(zip(*iterables))
+    out = sys.stdout.buffer
+    ok = True
+    with ProcessPoolExecutor() as executor:
+        for result in executor.map(_guarded, repeat(fn), jobs, chunksize=chunksize):
+            ok = ok and "error" not in result
+            out.write(dumps(result))
+            out.write(b'\n')
+    out.flush()
+    return 0 if ok else 1
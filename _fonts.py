@@ -0,0 +1,41 @@
+# _fonts.py
+"""
+Font loading shared by the scripts: lazy table decompilation over a read-only mmap,
+plus a small cache so back-to-back analyses of the same file parse it once.
+"""
+import os, mmap
+from functools import lru_cache
+from fontTools.ttLib import TTFont
+
+def open_font(path: str, lazy: bool = True, **kwargs) -> TTFont:
+    """
+    Open a font lazily so only the tables a script touches are decompiled.
+
+    The file is memory-mapped where possible (page-cache backed, no whole-file
+    read); the mapping is released by font.close(). Falls back to a plain path
+    open for files that cannot be mapped (e.g. empty files).
+    """
+    with open(path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            data = None
+    if data is None:
+        return TTFont(path, lazy=lazy, **kwargs)
+    try:
+        return TTFont(data, lazy=lazy, **kwargs)
+    except Exception:
+        data.close()
+        raise
+
+@lru_cache(maxsize=8)
+def _load(path: str, mtime_ns: int, size: int) -> TTFont:
+    return open_font(path)
+
+def get_font(path: str) -> TTFont:
+    """
+    Shared, read-only font for analysis. Cached on (path, mtime, size), so a
+    modified file is reloaded; callers must not mutate or close the result.
+    """
+    st = os.stat(path)
+    return _load(path, st.st_mtime_ns, st.st_size)
@@ -0,0 +1,24 @@
+# _output.py
+"""
+JSON output shared by the CLI entry points: orjson when available, stdlib json otherwise.
+Both paths emit UTF-8 bytes and are written straight to the binary stdout buffer.
+"""
+import sys, json
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+def dumps(obj, pretty: bool = False) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def write_json(obj, pretty: bool = False) -> None:
+    out = sys.stdout.buffer
+    out.write(dumps(obj, pretty))
+    out.write(b'\n')
+    out.flush()
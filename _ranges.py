@@ -0,0 +1,66 @@
+# _ranges.py
+"""
+Shared CSS unicode-range parsing for check_coverage, font_subsetter and subset_metrics.
+"""
+import re
+from functools import lru_cache
+import numpy as np
+
+MAX_CODEPOINT = 0x10FFFF
+
+# One pass over the whole spec: each match is a single comma-separated part.
+# The 'U+' prefix is optional and whitespace is tolerated around the parts.
+RANGE_RE = re.compile(
+    r'(?:^|,)\s*(?:U\+\s*)?([0-9A-F]{1,6})(?:\s*-\s*(?:U\+)?([0-9A-F]{1,6}))?\s*(?=,|$)',
+    re.IGNORECASE,
+)
+
+def _readonly(values) -> np.ndarray:
+    arr = np.array(values, dtype=np.int32)
+    arr.flags.writeable = False
+    return arr
+
+@lru_cache(maxsize=1024)
+def parse_ranges(css: str) -> tuple[np.ndarray, np.ndarray, tuple[str, ...]]:
+    """
+    Parse 'U+0000-00FF, U+0131, U+0152-0153' into (starts, ends, labels):
+      - starts/ends: read-only int32 arrays, one interval per part in spec order
+        (endpoints swapped if reversed, clipped to U+10FFFF, not merged)
+      - labels: normalized parts like ('U+0000-00FF', 'U+0131', 'U+0152-0153')
+
+    Invalid parts are skipped. Cached so every script reuses the same parse.
+    """
+    starts, ends, labels = [], [], []
+    for m in RANGE_RE.finditer(css or ''):
+        a = int(m.group(1), 16)
+        b = int(m.group(2), 16) if m.group(2) else a
+        s, e = (a, b) if a <= b else (b, a)
+        if s > MAX_CODEPOINT:
+            continue
+        e = min(e, MAX_CODEPOINT)
+        starts.append(s)
+        ends.append(e)
+        labels.append(f"U+{s:04X}-{e:04X}" if m.group(2) else f"U+{s:04X}")
+    return _readonly(starts), _readonly(ends), tuple(labels)
+
+def expand_ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Sorted, de-duplicated int32 array of every codepoint covered by the intervals."""
+    if not len(starts):
+        return np.empty(0, dtype=np.int32)
+    return np.unique(np.concatenate([
+        np.arange(s, e + 1, dtype=np.int32) for s, e in zip(starts.tolist(), ends.tolist())
+    ]))
+
+def merge_ranges(starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sort and merge overlapping/adjacent intervals into non-overlapping (starts, ends)."""
+    if not len(starts):
+        return starts, ends
+    order = np.lexsort((ends, starts))
+    s, e = starts[order], ends[order]
+    # an interval opens a new run unless it touches the furthest end seen so far
+    run_end = np.maximum.accumulate(e)
+    opens = np.empty(len(s), dtype=bool)
+    opens[0] = True
+    opens[1:] = s[1:] > run_end[:-1] + 1
+    heads = np.flatnonzero(opens)
+    return _readonly(s[heads]), _readonly(np.maximum.reduceat(e, heads))
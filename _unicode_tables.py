@@ -0,0 +1,82 @@
+# _unicode_tables.py
+"""
+Two-stage Unicode General Category lookup tables.
+
+STAGE1 maps each 256-codepoint block (cp >> 8) to a block index, STAGE2 holds
+the deduplicated 256-byte blocks. Each entry is a packed uint8 category code:
+the low bits index CATEGORIES, bit 7 flags combining marks (M*) and bit 6 flags
+control/format/unassigned (C*).
+
+The tables for the shipped Unicode database version are memory-mapped from
+the .npy file next to this module so startup stays cheap. On an interpreter
+with a different Unicode version they are built in memory instead; nothing is
+written at import time. Run this module directly to (re)generate the .npy for
+the current interpreter.
+"""
+import os, unicodedata
+import numpy as np
+
+MAX_CODEPOINT = 0x10FFFF
+BLOCK_SHIFT = 8
+BLOCK_SIZE = 1 << BLOCK_SHIFT
+NUM_BLOCKS = (MAX_CODEPOINT + 1) >> BLOCK_SHIFT  # 4352
+
+COMBINING = 0x80
+CONTROL = 0x40
+
+CATEGORIES = (
+    'Cc', 'Cf', 'Cn', 'Co', 'Cs', 'Ll', 'Lm', 'Lo', 'Lt', 'Lu',
+    'Mc', 'Me', 'Mn', 'Nd', 'Nl', 'No', 'Pc', 'Pd', 'Pe', 'Pf',
+    'Pi', 'Po', 'Ps', 'Sc', 'Sk', 'Sm', 'So', 'Zl', 'Zp', 'Zs',
+)
+
+def _encode(cat: str) -> int:
+    code = CATEGORIES.index(cat)
+    if cat[0] == 'M':
+        code |= COMBINING
+    elif cat[0] == 'C':
+        code |= CONTROL
+    return code
+
+CATEGORY_CODES = {cat: _encode(cat) for cat in CATEGORIES}
+UNASSIGNED = CATEGORY_CODES['Cn']
+
+_TABLE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    f"_unicode_tables-{unicodedata.unidata_version}.npy",
+)
+
+def build_tables() -> tuple[np.ndarray, np.ndarray]:
+    """Build (STAGE1, STAGE2) by scanning every codepoint once and deduping blocks."""
+    codes = CATEGORY_CODES
+    category = unicodedata.category
+    stage1 = np.zeros(NUM_BLOCKS, dtype=np.uint8)
+    blocks = {}
+    for b in range(NUM_BLOCKS):
+        base = b << BLOCK_SHIFT
+        block = bytes(codes[category(chr(cp))] for cp in range(base, base + BLOCK_SIZE))
+        stage1[b] = blocks.setdefault(block, len(blocks))
+    stage2 = np.frombuffer(b"".join(blocks), dtype=np.uint8)
+    return stage1, stage2
+
+def load_tables() -> tuple[np.ndarray, np.ndarray]:
+    """Memory-map the shipped tables, or build them in memory on a version mismatch."""
+    try:
+        packed = np.load(_TABLE_PATH, mmap_mode='r')
+    except (OSError, ValueError):
+        return build_tables()
+    return packed[:NUM_BLOCKS], packed[NUM_BLOCKS:]
+
+STAGE1, STAGE2 = load_tables()
+
+def category_codes(cps) -> np.ndarray:
+    """Vectorized lookup of packed category codes; out-of-range cps map to Cn."""
+    cps = np.asarray(cps, dtype=np.int32)
+    valid = (cps >= 0) & (cps <= MAX_CODEPOINT)
+    safe = np.where(valid, cps, 0)
+    codes = STAGE2[STAGE1[safe >> BLOCK_SHIFT].astype(np.intp) * BLOCK_SIZE + (safe & 0xFF)]
+    return np.where(valid, codes, UNASSIGNED).astype(np.uint8)
+
+if __name__ == '__main__':
+    np.save(_TABLE_PATH, np.concatenate(build_tables()))
+    print(_TABLE_PATH)
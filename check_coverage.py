@@ -1,18 +1,14 @@
 #!/usr/bin/env python3
 # coverage_check.py
-import json, sys, argparse, re, unicodedata
+import sys, argparse, unicodedata
+from itertools import repeat
 from functools import lru_cache
-from fontTools.ttLib import TTFont
-
-RANGE_RE = re.compile(r'U\+([0-9A-Fa-f]{1,6})(?:-([0-9A-Fa-f]{1,6}))?$')
-
-# Cache for Unicode category lookups to avoid repeated expensive calls
-@lru_cache(maxsize=8192)
-def cached_unicode_category(cp: int) -> str:
-    try:
-        return unicodedata.category(chr(cp))
-    except ValueError:
-        return 'Cn'  # Unassigned
+import numpy as np
+from _batch import read_batch_file, run_batch
+from _fonts import get_font
+from _output import write_json
+from _ranges import parse_ranges, expand_ranges
+from _unicode_tables import category_codes, COMBINING, CONTROL
 
 @lru_cache(maxsize=8192)
 def cached_unicode_name(cp: int) -> str:
@@ -21,79 +17,89 @@ def cached_unicode_name(cp: int) -> str:
     except ValueError:
         return '<UNASSIGNED>'
 
-def parse_unicode_ranges(spec: str) -> list[int]:
-    # e.g. "U+0000-00FF, U+0131, U+0152-0153"
-    cps = []
-    for part in (p.strip() for p in spec.split(',') if p.strip()):
-        m = RANGE_RE.fullmatch(part)
-        if not m:
-            continue
-        start = int(m.group(1), 16)
-        end = int(m.group(2), 16) if m.group(2) else start
-        cps.extend(range(start, end + 1))
-    return cps
+# ASCII names resolved once at import; controls have no name and map to '<UNASSIGNED>'
+_ASCII_NAMES = tuple(unicodedata.name(chr(cp), '<UNASSIGNED>') for cp in range(128))
+
+def parse_unicode_ranges(spec: str) -> np.ndarray:
+    # e.g. "U+0000-00FF, U+0131, U+0152-0153" -> sorted, unique int32 codepoints
+    starts, ends, _ = parse_ranges(spec)
+    return expand_ranges(starts, ends)
 
-def category_bucket(cp: int) -> str:
-    # Unicode General Category buckets - now using cached lookups
-    cat = cached_unicode_category(cp)
-    if cat.startswith('M'):      # Mn/Mc/Me
-        return 'combining'
-    if cat.startswith('C'):      # Cc/Cf/Co/Cn
-        # Cn = unassigned—often "missing by design" in subsets
-        return 'control_or_format'
-    return 'visible'
+def category_buckets(cps: np.ndarray) -> dict[str, np.ndarray]:
+    # Unicode General Category buckets via the two-stage table lookup
+    cats = category_codes(cps)
+    combining = (cats & COMBINING) != 0   # Mn/Mc/Me
+    # Cc/Cf/Co/Cn - Cn = unassigned, often "missing by design" in subsets
+    control = (cats & CONTROL) != 0
+    return {
+        'visible': cps[~(combining | control)],
+        'combining': cps[combining],
+        'control_or_format': cps[control],
+    }
 
 def name_safe(cp: int) -> str:
+    if cp < 128:
+        return _ASCII_NAMES[cp]
     return cached_unicode_name(cp)
 
-def check_coverage(font_path: str, unicode_spec: str) -> dict:
-    font = TTFont(font_path)
+def format_codepoints(cps: list[int]) -> list[str]:
+    # "U+XXXX: NAME" entries: resolve names in one pass, format in a second C-level map
+    return list(map("U+%04X: %s".__mod__, zip(cps, map(name_safe, cps))))
+
+def check_coverage(font_path: str, unicode_spec: str, full_lists: bool = False) -> dict:
+    font = get_font(font_path)
     cmap = font.getBestCmap() or {}
     requested = parse_unicode_ranges(unicode_spec)
-    requested_set = set(requested)
 
-    covered = {cp for cp in requested_set if cp in cmap}
-    missing  = requested_set - covered
+    # requested is already sorted, so both splits stay sorted
+    in_cmap = np.isin(requested, np.fromiter(cmap.keys(), dtype=np.int32, count=len(cmap)))
+    covered = requested[in_cmap]
+    missing  = requested[~in_cmap]
 
-    def summarize(cps: set[int]):
-        buckets = {'visible': [], 'combining': [], 'control_or_format': []}
-        for cp in sorted(cps):
-            buckets[category_bucket(cp)].append(cp)
+    def summarize(cps: np.ndarray, full: bool):
+        buckets = category_buckets(cps)
         
-        # Optimize: generate 'all' list only for smaller sets, use lazy evaluation for large sets
+        # Only resolve names for the sample unless full lists were asked for,
+        # so large specs don't pay one unicodedata.name call per codepoint
         def make_bucket_info(v):
-            count = len(v)
-            sample = [f"U+{cp:04X}: {name_safe(cp)}" for cp in v[:20]]
-            all_list = [f"U+{cp:04X}: {name_safe(cp)}" for cp in v]
-           
-            return {
-                'count': count,
-                'sample': sample,
-                'all': all_list
+            info = {
+                'count': len(v),
+                'sample': format_codepoints(v[:20].tolist()),
             }
+            if full:
+                info['all'] = format_codepoints(v.tolist())
+            return info
         
         return {k: make_bucket_info(v) for k, v in buckets.items()}
 
     report = {
         'font': font_path,
-        'requested_total': len(requested_set),
+        'requested_total': len(requested),
         'covered_total': len(covered),
         'missing_total': len(missing),
-        'coverage_percent': round(100.0 * len(covered) / max(1, len(requested_set)), 2),
-        'covered_breakdown': summarize(covered),
-        'missing_breakdown': summarize(missing),  # now has full 'all' lists
+        'coverage_percent': round(100.0 * len(covered) / max(1, len(requested)), 2),
+        'covered_breakdown': summarize(covered, full_lists),
+        'missing_breakdown': summarize(missing, full_lists),  # 'all' lists only with full_lists
         'font_cmap_size': len(cmap)
     }
     return report
 
 def main():
     ap = argparse.ArgumentParser(description='Check font coverage against a unicode-range spec')
-    ap.add_argument('font', help='Path to font (ttf/otf/woff/woff2)')
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument('font', nargs='?', help='Path to font (ttf/otf/woff/woff2)')
+    src.add_argument('--batch', metavar='FILE',
+                     help="File with one font path per line ('-' for stdin); writes one JSON line per font")
     ap.add_argument('unicode_range', help="e.g. \"U+0000-00FF, U+0131, U+0152-0153\"")
     ap.add_argument('--pretty', action='store_true', help='Pretty-print JSON')
+    ap.add_argument('--full-lists', action='store_true',
+                    help="Include every codepoint under each bucket's 'all' key (not just the sample)")
     args = ap.parse_args()
-    rep = check_coverage(args.font, args.unicode_range)
-    print(json.dumps(rep, indent=2 if args.pretty else None, ensure_ascii=False))
+    if args.batch:
+        paths = read_batch_file(args.batch)
+        return run_batch(check_coverage, paths, repeat(args.unicode_range), repeat(args.full_lists))
+    rep = check_coverage(args.font, args.unicode_range, args.full_lists)
+    write_json(rep, args.pretty)
 
 if __name__ == '__main__':
     sys.exit(main())
@@ -1,45 +1,83 @@
 #!/usr/bin/env python3
 import re
-from statistics import pstdev
-import sys, json
-from functools import lru_cache
-from fontTools.ttLib import TTFont
+import sys, argparse
+from array import array
+import numpy as np
+from _batch import read_batch_file, run_batch
+from _fonts import get_font
+from _output import write_json
 
 BARCODE_NAME_RE = re.compile(
     r"(barcode|code[\s\-]?39|code[\s\-]?128|ean|upc|itf|interleaved|msi|plessey|codabar|pdf417|datamatrix|qr|aztec)",
     re.IGNORECASE,
 )
+# Same pattern over raw name-record bytes, so most records never need decoding
+BARCODE_NAME_RE_BYTES = re.compile(BARCODE_NAME_RE.pattern.encode('ascii'), re.IGNORECASE)
+BARCODE_NAME_IDS = (1, 4, 6)  # Family, Full, PostScript
 
 CODE39_ALLOWED = set([ord(c) for c in "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789- .$/+%"])
 
-@lru_cache(maxsize=256)
-def _get_name_strings_cached(name_table_id):
-    """Cached version of name string extraction to avoid repeated table parsing"""
-    # This would need the actual table data, but we'll optimize the caller instead
-    pass
-
-def _get_name_strings(tt):
-    """Optimized name string extraction with early exit"""
-    names = []
+def _ascii_mask(cps) -> int:
+    # 128-bit set: bit n is set for ASCII codepoint n
+    mask = 0
+    for cp in cps:
+        mask |= 1 << cp
+    return mask
+
+CODE39_MASK = _ascii_mask(CODE39_ALLOWED)
+UPPER_MASK = _ascii_mask(range(0x41, 0x5B))
+LOWER_MASK = _ascii_mask(range(0x61, 0x7B))
+DIGIT_MASK = _ascii_mask(range(0x30, 0x3A))
+
+def _latin_profile(cmap):
+    """Single scan of the cmap keys -> (latin, uppers, lowers, digits, code39).
+
+    latin is the list of mapped printable ASCII codepoints in cmap order; the
+    counts (code39 = mapped Code 39 chars) are popcounts of its presence mask
+    (cmap keys are unique, so set bits == mapped chars).
+    """
+    cps = np.fromiter(cmap.keys(), dtype=np.int32, count=len(cmap))
+    latin = cps[(cps >= 0x20) & (cps <= 0x7E)].tolist()
+    present = _ascii_mask(latin)
+    return (latin, (present & UPPER_MASK).bit_count(), (present & LOWER_MASK).bit_count(),
+            (present & DIGIT_MASK).bit_count(), (present & CODE39_MASK).bit_count())
+
+def _name_has_barcode_hint(tt):
+    """Scan family/full/PostScript names for barcode keywords, early exit on first hit.
+
+    One record per nameID: Windows (3,1) first, Apple (1,0) only if there is no
+    Windows record. The chosen record is matched on its raw bytes: Mac Roman
+    as-is, UTF-16BE via its low bytes when every high byte is zero. Only other
+    records are decoded.
+    """
     if 'name' not in tt:
-        return ""
-    
+        return False
     name_table = tt['name']
-    # Try most common name IDs first for better cache efficiency
-    for nid in (1, 4, 6):  # Family, Full, PostScript
+    for nid in BARCODE_NAME_IDS:
         try:
-            # Try platform 3 (Microsoft) first, then platform 1 (Apple)
-            n = name_table.getName(nid, 3, 1) or name_table.getName(nid, 1, 0)
-            if n: 
-                names.append(str(n))
+            rec = name_table.getName(nid, 3, 1) or name_table.getName(nid, 1, 0)
+            if not rec:
+                continue
+            raw = rec.string
+            if isinstance(raw, str):
+                hit = BARCODE_NAME_RE.search(raw)
+            elif rec.platformID == 1:  # Mac Roman, ASCII-compatible
+                hit = BARCODE_NAME_RE_BYTES.search(raw)
+            elif not raw[0::2].strip(b"\0"):  # Latin-1 range UTF-16BE
+                hit = BARCODE_NAME_RE_BYTES.search(raw[1::2])
+            else:
+                hit = BARCODE_NAME_RE.search(rec.toUnicode())
         except Exception:
             continue
-    return " ".join(names)
+        if hit:
+            return True
+    return False
 
-def detect_barcode(tt):
+def detect_barcode(tt, *, latin=None, uppers=None, lowers=None, digits=None, code39=None):
+    # latin/uppers/lowers/digits/code39: precomputed _latin_profile() results from classify,
+    # so the cmap is only scanned once; computed here when called standalone
     # 1) Name signal - check this first for early exit
-    name_blob = _get_name_strings(tt)
-    name_hit = bool(BARCODE_NAME_RE.search(name_blob))
+    name_hit = _name_has_barcode_hint(tt)
     
     # Early exit if strong name signal
     if name_hit:
@@ -50,28 +88,18 @@ def detect_barcode(tt):
     if not cmap:  # Early exit if no character map
         return False
         
-    # Filter Latin range once and count in single pass
-    latin = []
-    uppers = lowers = digits = 0
-    for cp in cmap:
-        if 0x20 <= cp <= 0x7E:
-            latin.append(cp)
-            if 0x41 <= cp <= 0x5A:
-                uppers += 1
-            elif 0x61 <= cp <= 0x7A:
-                lowers += 1
-            elif 0x30 <= cp <= 0x39:
-                digits += 1
+    if latin is None:
+        latin, uppers, lowers, digits, code39 = _latin_profile(cmap)
     
     # Early exit if insufficient character coverage
     if len(latin) < 10:
         return False
 
     # Code 39 coverage ratio (how many mapped latin chars belong to code39 set)
-    code39_overlap = sum(cp in CODE39_ALLOWED for cp in latin) / len(latin)
+    code39_overlap = code39 / len(latin)
 
     # 3) Width profile (uniform advances among "barcodey" chars) - optimized sampling
-    widths = []
+    widths = array('i')  # unboxed ints
     if 'hmtx' in tt:
         hmtx = tt['hmtx'].metrics
         # Sample only first 30 characters for speed (reduced from all latin chars)
@@ -82,15 +110,20 @@ def detect_barcode(tt):
                 widths.append(adv)
 
     width_uniform = False
-    if len(widths) >= 5:  # Need minimum sample size
-        mean_w = sum(widths) / len(widths)
-        if mean_w > 0:
-            cv = pstdev(widths) / mean_w  # coefficient of variation
+    n = len(widths)
+    if n >= 5:  # Need minimum sample size
+        total = sum(widths)
+        if total > 0:
+            # population stdev / mean from integer sums (exact, no statistics module):
+            # cv = sqrt(n*sum(x^2) - sum(x)^2) / sum(x)
+            sq = sum(w * w for w in widths)
+            cv = (n * sq - total * total) ** 0.5 / total  # coefficient of variation
             width_uniform = (cv < 0.02)   # very tight; relax to 0.05 if needed
 
     # 4) Vertical geometry + OS/2 hints - optimized sampling
-    xh = getattr(tt.get('OS/2', {}), 'sxHeight', 0)
-    units_per_em = getattr(tt.get('head', {}), 'unitsPerEm', 1000)
+    # sxHeight only exists from OS/2 version 2 on; older or missing tables count as 0
+    xh = tt['OS/2'].sxHeight if 'OS/2' in tt and tt['OS/2'].version >= 2 else 0
+    units_per_em = tt['head'].unitsPerEm if 'head' in tt else 1000
 
     tall_boxes_ratio = 0.0
     if 'glyf' in tt and len(latin) > 0:
@@ -127,7 +160,7 @@ def detect_barcode(tt):
     return bool(is_barcode)
 
 def classify(path):
-    f = TTFont(path)
+    f = get_font(path)
     tables = set(f.keys())
     
     # emoji/color - check most common color tables first
@@ -152,24 +185,20 @@ def classify(path):
         except:
             pass
 
-    # non-textual quick check - single pass through cmap
+    # non-textual quick check - single pass through cmap, shared with detect_barcode
     cmap = f.getBestCmap() or {}
     if not cmap:
         non_textual = True
         is_barcode = False
     else:
-        letters = digits = 0
-        for cp in cmap:
-            if 0x20 <= cp <= 0x7E:  # ASCII printable range
-                if 0x41 <= cp <= 0x5A or 0x61 <= cp <= 0x7A:  # letters
-                    letters += 1
-                elif 0x30 <= cp <= 0x39:  # digits
-                    digits += 1
+        latin, uppers, lowers, digits, code39 = _latin_profile(cmap)
         
-        non_textual = (letters < 10 and digits < 5)
+        non_textual = (uppers + lowers < 10 and digits < 5)
         
         # Only run expensive barcode detection if needed
-        is_barcode = detect_barcode(f) if not (is_emoji or is_symbol) else False
+        is_barcode = detect_barcode(f, latin=latin, uppers=uppers, lowers=lowers,
+                                    digits=digits, code39=code39) \
+            if not (is_emoji or is_symbol) else False
 
     return {
         "is_emoji": bool(is_emoji),
@@ -178,6 +207,16 @@ def classify(path):
         "is_non_textual": bool(non_textual)
     }
 
+def main():
+    ap = argparse.ArgumentParser(description="Identify non-textual (emoji/symbol/barcode) fonts")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("path", nargs="?", help="Path to font")
+    src.add_argument("--batch", metavar="FILE",
+                     help="File with one font path per line ('-' for stdin); writes one JSON line per font")
+    args = ap.parse_args()
+    if args.batch:
+        return run_batch(classify, read_batch_file(args.batch))
+    write_json(classify(args.path))
+
 if __name__ == "__main__":
-    path = sys.argv[1]
-    print(json.dumps(classify(path)))
+    sys.exit(main())
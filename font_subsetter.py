@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 # font_subsetter.py
-import sys, json, argparse, os, subprocess
+import sys, argparse, os
+from io import BytesIO
+from itertools import repeat
 from typing import List, Tuple
 from functools import lru_cache
-from fontTools.ttLib import TTFont
 from fontTools import subset
+from fontTools.ttLib import woff2
+from _batch import read_batch_file, run_batch
+from _fonts import open_font
+from _output import write_json
+from _ranges import parse_ranges, expand_ranges
 
 def _normalize_newlines(s: str) -> str:
     return s.replace("\r\n", "\n").replace("\r", "\n")
@@ -13,47 +19,44 @@ def _normalize_newlines(s: str) -> str:
 def parse_unicode_ranges(css: str) -> Tuple[List[int], List[str]]:
     """
     Parse 'U+0000-00FF, U+0131, U+0152-0153' into:
-      - list of integer codepoints
+      - sorted list of unique integer codepoints
       - normalized compact range strings like ['U+0000-00FF','U+0131','U+0152-0153']
     
     Cached to avoid repeated parsing of common Unicode ranges.
     """
-    if not css:
-        return [], []
-
-    # Optimize string cleaning with fewer operations
-    cleaned = css.strip().replace('u+', 'U+').replace('U+ ', 'U+')
-    parts = [p.strip() for p in cleaned.split(',') if p.strip()]
-    unicodes = []
-    normalized_ranges = []
-
-    for part in parts:
-        p = part.upper()
-        if p.startswith('U+'):
-            p = p[2:]
-        if '-' in p:
-            try:
-                start, end = p.split('-', 1)
-                s_i, e_i = int(start, 16), int(end, 16)
-                if e_i < s_i:
-                    s_i, e_i = e_i, s_i
-                # Use extend for better performance on large ranges
-                unicodes.extend(range(s_i, e_i + 1))
-                normalized_ranges.append(f"U+{s_i:04X}-{e_i:04X}")
-            except ValueError:
-                continue
-        else:
-            try:
-                cp = int(p, 16)
-                unicodes.append(cp)
-                normalized_ranges.append(f"U+{cp:04X}")
-            except ValueError:
-                continue
-
-    # More efficient deduplication using dict.fromkeys (preserves order in Python 3.7+)
-    uniq_unicodes = list(dict.fromkeys(unicodes))
-
-    return uniq_unicodes, normalized_ranges
+    starts, ends, labels = parse_ranges(css)
+    # Deduplicate as one int32 array (np.unique) rather than hashing every codepoint;
+    # only the final result is converted back to Python ints
+    return expand_ranges(starts, ends).tolist(), list(labels)
+
+def _save_direct_woff2(font, output_path: str):
+    # Requires 'brotli' python module available to fontTools
+    font.flavor = "woff2"
+    font.save(output_path)
+    return "woff2", os.path.getsize(output_path), ["repack:woff2"]
+
+def _save_compressed_woff2(font, output_path: str):
+    # Re-encode through an in-memory sfnt with fontTools' standalone compressor
+    font.flavor = None
+    sfnt = BytesIO()
+    font.save(sfnt)
+    sfnt.seek(0)
+    woff2.compress(sfnt, output_path)
+    return "woff2", os.path.getsize(output_path), ["repack:woff2(compress)"]
+
+def _save_plain(font, output_path: str):
+    # Save as TTF/OTF (same flavor as input)
+    font.flavor = None
+    font.save(output_path)
+    out_format = "ttf" if output_path.lower().endswith('.ttf') else "otf"
+    return out_format, os.path.getsize(output_path), []
+
+# (output suffix, allow_direct_woff2) -> saver returning (out_format, file_size, lossless_ops);
+# anything not listed is saved as a plain sfnt
+SAVERS = {
+    ('.woff2', True): _save_direct_woff2,
+    ('.woff2', False): _save_compressed_woff2,
+}
 
 def subset_font(input_path: str, output_path: str, unicode_range: str,
                 preserve_names: bool = True, allow_direct_woff2: bool = True, quiet=False):
@@ -75,13 +78,11 @@ def subset_font(input_path: str, output_path: str, unicode_range: str,
         return {"error": "No valid unicode codepoints found"}
 
     font = None
-    temp_ttf = None
     try:
-        font = TTFont(input_path)
+        font = open_font(input_path)
         # More efficient glyph counting
-        glyph_order = font.getGlyphOrder()
-        glyphs_before = len(glyph_order)
-        tables_before = set(font.keys())
+        glyphs_before = len(font.getGlyphOrder())
+        tables_before = font.keys()
 
         # Subsetter options (FE-friendly by default)
         options = subset.Options()
@@ -104,63 +105,20 @@ def subset_font(input_path: str, output_path: str, unicode_range: str,
         subsetter.populate(unicodes=unicodes)
         subsetter.subset(font)
 
-        # More efficient post-subset analysis
-        glyphs_after = len(font.getGlyphOrder())
-        tables_after = set(font.keys())
+        # More efficient post-subset analysis: the subsetter updates glyphOrder in place,
+        # and the table list is taken once and reused for every table-based field below
+        glyphs_after = len(font.glyphOrder)
+        tables_after = font.keys()
         kept_tables = sorted(tables_after)
-        dropped_tables = sorted(tables_before - tables_after)
-
-        # Try direct WOFF2 if requested and extension is .woff2
-        lossless_ops = []
-        if output_path.lower().endswith('.woff2'):
-            if allow_direct_woff2:
-                try:
-                    # Requires 'brotli' python module available to fontTools
-                    font.flavor = "woff2"
-                    font.save(output_path)
-                    lossless_ops.append("repack:woff2")
-                    out_format = "woff2"
-                    file_size = os.path.getsize(output_path)
-                except Exception as e:
-                    # Fallback to external compressor if available
-                    temp_ttf = os.path.join(out_dir, os.path.basename(output_path).replace('.woff2', '_temp.ttf'))
-                    font.flavor = None
-                    font.save(temp_ttf)
-                    try:
-                        subprocess.run(['woff2_compress', temp_ttf], check=True, capture_output=True)
-                        generated_woff2 = temp_ttf.replace('.ttf', '.woff2')
-                        if os.path.exists(generated_woff2):
-                            os.replace(generated_woff2, output_path)
-                            out_format = "woff2"
-                            file_size = os.path.getsize(output_path)
-                            lossless_ops.append("repack:woff2(cli)")
-                        else:
-                            return {"error": "WOFF2 file was not generated by woff2_compress"}
-                    except FileNotFoundError:
-                        return {"error": "Direct WOFF2 failed and woff2_compress not found in PATH"}
-            else:
-                # Explicitly use external tool path
-                temp_ttf = os.path.join(out_dir, os.path.basename(output_path).replace('.woff2', '_temp.ttf'))
-                font.flavor = None
-                font.save(temp_ttf)
-                try:
-                    subprocess.run(['woff2_compress', temp_ttf], check=True, capture_output=True)
-                    generated_woff2 = temp_ttf.replace('.ttf', '.woff2')
-                    if os.path.exists(generated_woff2):
-                        os.replace(generated_woff2, output_path)
-                        out_format = "woff2"
-                        file_size = os.path.getsize(output_path)
-                        lossless_ops.append("repack:woff2(cli)")
-                    else:
-                        return {"error": "WOFF2 file was not generated by woff2_compress"}
-                except FileNotFoundError:
-                    return {"error": "woff2_compress not found in PATH"}
-        else:
-            # Save as TTF/OTF (same flavor as input)
-            font.flavor = None
-            font.save(output_path)
-            out_format = "ttf" if output_path.lower().endswith('.ttf') else "otf"
-            file_size = os.path.getsize(output_path)
+        dropped_tables = sorted(set(tables_before).difference(tables_after))
+
+        # Pick the saver once from the output suffix (direct WOFF2 unless disabled)
+        suffix = os.path.splitext(output_path)[1].lower()
+        saver = SAVERS.get((suffix, allow_direct_woff2), _save_plain)
+        try:
+            out_format, file_size, lossless_ops = saver(font, output_path)
+        except Exception as e:
+            return {"error": f"Saving {os.path.basename(output_path)} failed: {str(e)}"}
 
         # Compute a conservative FE flag for the *artifact*
         # (no metadata/shape stripping + format ∈ allowed)
@@ -171,7 +129,7 @@ def subset_font(input_path: str, output_path: str, unicode_range: str,
             True  # placeholder to keep the condition readable
         )
 
-        kept = sorted(font.keys())  # or use your existing kept_tables list
+        kept = set(tables_after)
 
         removed_metadata = not ("name" in kept)
         removed_shaping  = not (("GSUB" in kept) or ("GPOS" in kept) or ("GDEF" in kept))
@@ -182,7 +140,7 @@ def subset_font(input_path: str, output_path: str, unicode_range: str,
             "output_path": output_path,
             "format": out_format,
             "unicodes_requested": len(unicodes),
-            "unicodes_kept": len({cp for cp in unicodes}),  # after dedupe
+            "unicodes_kept": len(unicodes),  # already deduplicated by parse_unicode_ranges
             "normalized_ranges": normalized_ranges,
             "glyphs_before": glyphs_before,
             "glyphs_after": glyphs_after,
@@ -204,16 +162,11 @@ def subset_font(input_path: str, output_path: str, unicode_range: str,
                 font.close()
         except Exception:
             pass
-        if temp_ttf and os.path.exists(temp_ttf):
-            try:
-                os.remove(temp_ttf)
-            except Exception:
-                pass
 
 def main():
     parser = argparse.ArgumentParser(description="Subset fonts and optionally convert to WOFF2")
-    parser.add_argument("input_font", help="Path to input font file")
-    parser.add_argument("output_font", help="Path to output font file (.ttf/.otf or .woff2)")
+    parser.add_argument("input_font", nargs="?", help="Path to input font file")
+    parser.add_argument("output_font", nargs="?", help="Path to output font file (.ttf/.otf or .woff2)")
     parser.add_argument("unicode_range", help="Unicode range (e.g., 'U+0000-00FF,U+0131')")
     parser.add_argument(
         "--preserve-names", dest="preserve_names",
@@ -226,11 +179,28 @@ def main():
         help="Drop/strip name records that would collide with RFNs"
     )
     parser.add_argument("--no-direct-woff2", action="store_true",
-                        help="Disable direct WOFF2 save and use woff2_compress if needed")
+                        help="Save an intermediate sfnt in memory and compress it with fontTools' woff2.compress instead of saving WOFF2 directly")
     parser.add_argument("--quiet", action="store_true", help="Minimal JSON output")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="File with one 'input<TAB>output' pair per line ('-' for stdin) "
+                             "instead of input_font/output_font; writes one JSON line per font")
 
     args = parser.parse_args()
 
+    if args.batch:
+        if args.input_font or args.output_font:
+            parser.error("--batch cannot be combined with input_font/output_font")
+        pairs = [line.split("\t") for line in read_batch_file(args.batch)]
+        bad = [i for i, p in enumerate(pairs, 1) if len(p) != 2]
+        if bad:
+            parser.error(f"--batch lines must be 'input<TAB>output' (bad line(s): {bad})")
+        inputs, outputs = zip(*pairs) if pairs else ((), ())
+        sys.exit(run_batch(subset_font, inputs, outputs, repeat(args.unicode_range),
+                           repeat(args.preserve_names), repeat(not args.no_direct_woff2),
+                           repeat(args.quiet)))
+    if not args.output_font:
+        parser.error("input_font and output_font are required unless --batch is given")
+
     result = subset_font(
         args.input_font,
         args.output_font,
@@ -240,7 +210,7 @@ def main():
         quiet=args.quiet
     )
 
-    print(json.dumps(result, indent=None if args.quiet else 2))
+    write_json(result, pretty=not args.quiet)
     sys.exit(0 if result.get("success") else 1)
 
 if __name__ == "__main__":
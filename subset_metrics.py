@@ -1,63 +1,38 @@
 #!/usr/bin/env python3
 # subset_metrics.py
-import sys, json, argparse, statistics, bisect
+import sys, argparse
+from itertools import repeat
+from array import array
 from functools import lru_cache
-from fontTools.ttLib import TTFont
+import numpy as np
+from _batch import read_batch_file, run_batch
+from _fonts import get_font
+from _output import write_json
+from _ranges import parse_ranges, merge_ranges
 
 @lru_cache(maxsize=512)
 def parse_unicode_ranges(css: str):
     """
-    Parse 'U+0000-00FF, U+0131, U+0152-0153' into sorted non-overlapping intervals [(start,end),...]
+    Parse 'U+0000-00FF, U+0131, U+0152-0153' into sorted non-overlapping intervals
+    as two parallel int32 arrays (starts, ends).
     
-    Cached to avoid repeated parsing of common Unicode ranges.
+    Cached to avoid repeated parsing of common Unicode ranges; the arrays are
+    read-only since they are shared between callers.
     """
-    if not css:
-        return tuple()  # Return tuple for hashability in cache
-    
-    parts = [p.strip() for p in css.replace('U+', '').split(',') if p.strip()]
-    intervals = []
-    for p in parts:
-        if '-' in p:
-            a, b = p.split('-', 1)
-            try:
-                intervals.append((int(a, 16), int(b, 16)))
-            except ValueError:
-                continue
-        else:
-            try:
-                v = int(p, 16)
-                intervals.append((v, v))
-            except ValueError:
-                continue
-    
-    if not intervals:
-        return tuple()
-
-    # merge overlaps - optimized
-    intervals.sort()
-    merged = []
-    cur_s, cur_e = intervals[0]
-    for s, e in intervals[1:]:
-        if s <= cur_e + 1:
-            cur_e = max(cur_e, e)
-        else:
-            merged.append((cur_s, cur_e))
-            cur_s, cur_e = s, e
-    merged.append((cur_s, cur_e))
-    return tuple(merged)  # Return tuple for hashability
+    starts, ends, _ = parse_ranges(css)
+    return merge_ranges(starts, ends)
 
-def codepoint_in_intervals(cp: int, ivals):
-    # binary search over starts
-    idx = bisect.bisect_right(ivals, (cp, 1 << 31)) - 1
-    if idx < 0: return False
-    s,e = ivals[idx]
-    return s <= cp <= e
+def codepoints_in_intervals(cps: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    # vectorized binary search over starts: O(N log R), no per-codepoint expansion
+    idx = np.searchsorted(starts, cps, side='right') - 1
+    return (idx >= 0) & (cps <= ends[np.maximum(idx, 0)])
 
 def subset_xavg(font_path: str, css_range: str, quiet=False):
     try:
-        font = TTFont(font_path)
+        font = get_font(font_path)
         upem = font['head'].unitsPerEm
-        hmtx = font['hmtx'].metrics
+        # glyph name -> advance width, so each lookup is one dict hit with no tuple unpacking
+        advances = {g: adv for g, (adv, _) in font['hmtx'].metrics.items()}
         name_table = font['name']
 
         # Extract font names
@@ -74,28 +49,25 @@ def subset_xavg(font_path: str, css_range: str, quiet=False):
                 continue
 
         cmap = font.getBestCmap() or {}
-        intervals = parse_unicode_ranges(css_range)
+        starts, ends = parse_unicode_ranges(css_range)
 
-        if not intervals:
+        if not len(starts):
             return {"error":"empty_or_invalid_unicode_range"}
 
-        # Optimized filtering: pre-filter cmap entries instead of checking each one
-        widths = []
-        attempted = 0
+        # Interval test over all cmap keys at once, then visit only the matches
+        cps = np.fromiter(cmap.keys(), dtype=np.int32, count=len(cmap))
+        matched = cps[codepoints_in_intervals(cps, starts, ends)].tolist()
+        attempted = len(matched)
         
-        # Create set of all codepoints in intervals for faster lookup
-        target_cps = set()
-        for start, end in intervals:
-            target_cps.update(range(start, end + 1))
-        
-        # Filter cmap more efficiently
-        for cp, gname in cmap.items():
-            if cp in target_cps:
-                attempted += 1
-                m = hmtx.get(gname)
-                if m:
-                    adv, _ = m
-                    widths.append(adv)
+        # Collect into a preallocated unboxed buffer, viewed by NumPy without a copy
+        widths_buf = array('i', bytes(attempted * array('i').itemsize))
+        n = 0
+        for cp in matched:
+            adv = advances.get(cmap[cp])
+            if adv is not None:
+                widths_buf[n] = adv
+                n += 1
+        widths = np.frombuffer(widths_buf, dtype=np.intc, count=n)
 
         result = {
             "postscriptName": postscript_name,
@@ -106,10 +78,10 @@ def subset_xavg(font_path: str, css_range: str, quiet=False):
             "coverage_ratio": (len(widths) / attempted) if attempted else 0.0,
         }
 
-        if widths:
-            mean_w = statistics.fmean(widths)
-            med_w  = statistics.median(widths)
-            std_w  = statistics.pstdev(widths) if len(widths) > 1 else 0.0
+        if len(widths):
+            mean_w = float(widths.mean())
+            med_w  = float(np.median(widths))
+            std_w  = float(widths.std())
             result.update({
                 "xAvgCharWidth": mean_w,
                 "xMedianCharWidth": med_w,
@@ -130,13 +102,20 @@ def subset_xavg(font_path: str, css_range: str, quiet=False):
 
 def main():
     ap = argparse.ArgumentParser(description="Subset xAvgCharWidth calculator")
-    ap.add_argument("font_path")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("font_path", nargs="?")
+    src.add_argument("--batch", metavar="FILE",
+                     help="File with one font path per line ('-' for stdin); writes one JSON line per font")
     ap.add_argument("unicode_range")
     ap.add_argument("--quiet", action="store_true")
     args = ap.parse_args()
 
+    if args.batch:
+        paths = read_batch_file(args.batch)
+        sys.exit(run_batch(subset_xavg, paths, repeat(args.unicode_range), repeat(args.quiet)))
+
     out = subset_xavg(args.font_path, args.unicode_range, args.quiet)
-    print(json.dumps(out, indent=None if args.quiet else 2))
+    write_json(out, pretty=not args.quiet)
     sys.exit(0 if "error" not in out else 1)
 
 if __name__ == "__main__":